@@ -1,226 +1,502 @@
 #!/usr/bin/env python3
 import os
-import requests
+import io
+import asyncio
+import httpx
 import json
 import logging
+import functools
+import inspect
+import weakref
+import hashlib
+import argparse
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from operator import itemgetter
+from lxml import etree as ET
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+# httpx logger hvert kall på INFO-nivå, som blir titusenvis av linjer
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Maks antall HTTP-kall som pågår samtidig
+MAX_CONCURRENCY = 20
+
+# Maks antall åpne (gjenbrukte) forbindelser mot data.stortinget.no
+POOL_SIZE = 50
+
+# Nye forsøk med eksponentiell backoff ved forbigående feil
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class UnexpectedDocumentError(Exception):
+    """
+    Svaret er gyldig XML, men ikke et dokument fra data.stortinget.no.
+    """
+
+# Feil ved tolking av et svar, og alle feil ved henting eller tolking
+PARSE_ERRORS = (ET.XMLSyntaxError, UnexpectedDocumentError)
+FETCH_ERRORS = (httpx.HTTPError,) + PARSE_ERRORS
+
+# Katalog med lagrede XML-svar fra avsluttede sesjoner
+CACHE_DIR = "cache"
+
+# Navnerommet alle svar fra data.stortinget.no bruker
+NS = 'http://data.stortinget.no'
+
+# Forhåndskompilerte XPath-uttrykk for oppslag i hele dokumentet
+XPATH_NS = {'ns': NS}
+XP_SAKER = ET.XPath('.//ns:sak', namespaces=XPATH_NS)
+XP_SAK_VOTERINGER = ET.XPath('.//ns:sak_votering', namespaces=XPATH_NS)
+# Første korttittel og første tittel i ett oppslag (i dokumentrekkefølge)
+XP_SAKSTITLER = ET.XPath('(.//ns:korttittel)[1] | (.//ns:tittel)[1]', namespaces=XPATH_NS)
+TAG_KORTTITTEL = f'{{{NS}}}korttittel'
+
+# Tagger som strømmes med iterparse fra voteringsdetaljene
+TAG_VOTERING_DATO_TID = f'{{{NS}}}votering_dato_tid'
+TAG_REPRESENTANT_VOTERING = f'{{{NS}}}representant_votering'
+
+# Fullt kvalifiserte tagger (Clark-notasjon) slik at find() slipper å tolke
+# prefiks og navnerom ved hvert kall
+TAG_ID = f'{{{NS}}}id'
+TAG_VOTERING_RESULTAT = f'{{{NS}}}votering_resultat'
+TAG_VOTERING_TID = f'{{{NS}}}votering_tid'
+TAG_REPRESENTANT = f'{{{NS}}}representant'
+TAG_FORNAVN = f'{{{NS}}}fornavn'
+TAG_ETTERNAVN = f'{{{NS}}}etternavn'
+TAG_PARTI = f'{{{NS}}}parti'
+VOTERING_FIELDS = [
+    (field, f'{{{NS}}}{field}')
+    for field in ('votering_id', 'antall_for', 'antall_mot', 'vedtatt', 'votering_tema', 'sak_id')
+]
+
+def memoize_async(func):
+    """
+    Cache resultatet av en korutine per argument (utenom client og sem).
+    Samtidige kall med samme argumenter deler samme oppgave. Cachen holdes
+    per client, så oppgaver fra en tidligere event loop aldri gjenbrukes.
+    """
+    cache = weakref.WeakKeyDictionary()
+    signature = inspect.signature(func)
+    
+    @functools.wraps(func)
+    def wrapper(client, sem, *args, **kwargs):
+        # Normaliser argumentene så posisjonelle, navngitte og utelatte
+        # standardverdier gir samme nøkkel
+        bound = signature.bind(client, sem, *args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.values())[2:]
+        
+        client_cache = cache.setdefault(client, {})
+        if key not in client_cache:
+            client_cache[key] = asyncio.ensure_future(func(*bound.args, **bound.kwargs))
+        return client_cache[key]
+    
+    return wrapper
+
+def session_is_closed(sesjon):
+    """
+    Sjekk om en sesjon er avsluttet. En sesjon varer fra 1. oktober til
+    30. september året etter, og dataene endres ikke etter at den er over.
+    """
+    start_year = int(sesjon.split('-')[0])
+    return datetime.now() >= datetime(start_year + 1, 10, 1)
+
+def check_root(root):
+    """
+    Sjekk at rotelementet hører til navnerommet til data.stortinget.no, så
+    f.eks. en HTML-side for vedlikehold ikke tolkes som et tomt svar.
+    """
+    if ET.QName(root).namespace != NS:
+        raise UnexpectedDocumentError(f"uventet rotelement {root.tag}")
+    return root
+
+async def fetch_xml(client, sem, url, timeout, parse, cacheable=False):
+    """
+    Hent XML fra en URL og returner resultatet av parse(innhold).
+    Forbigående feil prøves på nytt opptil MAX_RETRIES ganger, og sem
+    begrenser antall samtidige kall. Er cacheable satt, lagres svaret i
+    CACHE_DIR først når parse har godtatt det, og gjenbrukes ved senere
+    kjøringer. En cachefil som ikke lar seg tolke slettes og hentes på nytt.
+    """
+    cache_file = os.path.join(CACHE_DIR, hashlib.sha1(url.encode()).hexdigest() + ".xml")
+    if cacheable and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                return parse(f.read())
+        except OSError as e:
+            # En uleselig cachefil er ikke fatal, hent svaret på nytt i stedet
+            logging.warning(f"Kunne ikke lese cache for {url}: {e}")
+        except PARSE_ERRORS as e:
+            logging.warning(f"Ugyldig cache for {url} ({e}), henter på nytt")
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+    
+    for attempt in range(MAX_RETRIES + 1):
+        retry = attempt < MAX_RETRIES
+        try:
+            # Begrens antall kall i luften så timeouten ikke løper mens kallet står i kø
+            async with sem:
+                resp = await client.get(url, timeout=timeout)
+            if retry and resp.status_code in RETRY_STATUSES:
+                logging.warning(f"Status {resp.status_code} fra {url}, prøver igjen")
+            else:
+                resp.raise_for_status()
+                content = resp.content
+                break
+        except httpx.TransportError as e:
+            if not retry:
+                raise
+            logging.warning(f"Feil ved henting av {url} ({e!r}), prøver igjen")
+        
+        # Vent utenfor semaforen så andre kall slipper til i mellomtiden
+        await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+    
+    # Tolk før lagring, så et ugyldig svar aldri havner i cachen
+    result = parse(content)
+    
+    if cacheable:
+        # Skriv via en midlertidig fil så en avbrutt kjøring ikke etterlater halve svar
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            # Svaret er hentet, så en feil ved lagring koster bare en ny henting neste gang
+            logging.warning(f"Kunne ikke lagre cache for {url}: {e}")
+            if os.path.isfile(tmp_file):
+                os.remove(tmp_file)
+    
+    return result
 
 def fetch_all_sessions_since_2022():
     """
     Hent alle sesjoner fra 2022 til nå.
     """
-    current_year = datetime.now().year
+    now = datetime.now()
     sessions = []
     
-    for year in range(2022, current_year + 2):
+    # En sesjon starter 1. oktober, så før det er fjorårets sesjon den siste
+    last_start_year = now.year if now.month >= 10 else now.year - 1
+    
+    for year in range(2022, last_start_year + 1):
         sessions.append(f"{year}-{year+1}")
     
     return sessions
 
-def fetch_saker_from_session(sesjon):
+def parse_saker(content):
+    """
+    Hent sak-id-ene fra en saksliste.
+    """
+    root = check_root(ET.fromstring(content))
+    sak_ids = []
+    for sak in XP_SAKER(root):
+        sak_id_elem = sak.find(TAG_ID)
+        if sak_id_elem is not None and sak_id_elem.text:
+            sak_ids.append(sak_id_elem.text)
+    
+    return sak_ids
+
+async def fetch_saker_from_session(client, sem, sesjon):
     """
     Hent alle saker fra en sesjon.
     """
     url = f"https://data.stortinget.no/eksport/saker?sesjonid={sesjon}"
+    cacheable = session_is_closed(sesjon)
     
     logging.info(f"Henter saker fra sesjon {sesjon}")
     
     try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        
-        root = ET.fromstring(resp.content)
-        ns = {'ns': 'http://data.stortinget.no'}
-        
-        sak_ids = []
-        for sak in root.findall('.//ns:sak', ns):
-            sak_id_elem = sak.find('ns:id', ns)
-            if sak_id_elem is not None and sak_id_elem.text:
-                sak_ids.append(sak_id_elem.text)
-        
+        sak_ids = await fetch_xml(client, sem, url, 30, parse_saker, cacheable)
         logging.info(f"Fant {len(sak_ids)} saker i {sesjon}")
         return sak_ids
         
-    except Exception as e:
-        logging.error(f"Feil ved henting av saker fra {sesjon}: {e}")
+    except FETCH_ERRORS as e:
+        logging.error(f"Feil ved henting av saker fra {url}: {e}")
         return []
 
-def fetch_voteringer_for_sak(sak_id):
+def parse_voteringer(content):
+    """
+    Hent feltene for hver votering i en sak.
+    """
+    root = check_root(ET.fromstring(content))
+    votes = []
+    for votering in XP_SAK_VOTERINGER(root):
+        vote_data = {}
+        
+        # Hent dato fra votering_resultat hvis den finnes der
+        resultat = votering.find(TAG_VOTERING_RESULTAT)
+        if resultat is not None:
+            dato_elem = resultat.find(TAG_VOTERING_DATO_TID)
+            if dato_elem is not None:
+                vote_data['votering_tid'] = dato_elem.text
+        
+        # Hent andre felter
+        for field, tag in VOTERING_FIELDS:
+            elem = votering.find(tag)
+            if elem is not None:
+                vote_data[field] = elem.text
+        
+        # Hvis vi fortsatt ikke har tid, prøv votering_tid direkte
+        if 'votering_tid' not in vote_data:
+            tid_elem = votering.find(TAG_VOTERING_TID)
+            if tid_elem is not None:
+                vote_data['votering_tid'] = tid_elem.text
+        
+        if vote_data and vote_data.get('votering_id'):
+            votes.append(vote_data)
+    
+    return votes
+
+async def fetch_voteringer_for_sak(client, sem, sak_id, cacheable=False):
     """
     Hent alle voteringer for en sak.
     """
     url = f"https://data.stortinget.no/eksport/voteringer?sakid={sak_id}"
     
     try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
+        return await fetch_xml(client, sem, url, 20, parse_voteringer, cacheable)
         
-        root = ET.fromstring(resp.content)
-        ns = {'ns': 'http://data.stortinget.no'}
+    except FETCH_ERRORS as e:
+        logging.warning(f"Kunne ikke hente voteringer fra {url}: {e}")
+        return []
+
+def parse_vote_details(content):
+    """
+    Hent individuelle stemmer OG riktig dato fra en votering.
+    """
+    # Strøm gjennom dokumentet i stedet for å bygge hele treet
+    dato_tid = None
+    stemmer = []
+    context = ET.iterparse(io.BytesIO(content), events=('end',),
+                           tag=(TAG_VOTERING_DATO_TID, TAG_REPRESENTANT_VOTERING))
+    for _, stemme in context:
+        # Hent riktig dato
+        if stemme.tag == TAG_VOTERING_DATO_TID:
+            if dato_tid is None:
+                dato_tid = stemme.text
+            continue
         
-        votes = []
-        for votering in root.findall('.//ns:sak_votering', ns):
-            vote_data = {}
-            
-            # Hent dato fra votering_resultat hvis den finnes der
-            resultat = votering.find('ns:votering_resultat', ns)
-            if resultat is not None:
-                dato_elem = resultat.find('ns:votering_dato_tid', ns)
-                if dato_elem is not None:
-                    vote_data['votering_tid'] = dato_elem.text
+        # Hent stemmer. Nullstill feltene så en stemme uten representant
+        # ikke arver navn og parti fra forrige stemme
+        fornavn = etternavn = parti_id = ""
+        representant_elem = stemme.find(TAG_REPRESENTANT)
+        if representant_elem is not None:
+            fornavn_elem = representant_elem.find(TAG_FORNAVN)
+            etternavn_elem = representant_elem.find(TAG_ETTERNAVN)
+            parti_elem = representant_elem.find(TAG_PARTI)
             
-            # Hent andre felter
-            for field in ['votering_id', 'antall_for', 'antall_mot', 'vedtatt', 
-                         'votering_tema', 'sak_id']:
-                elem = votering.find(f'ns:{field}', ns)
-                if elem is not None:
-                    vote_data[field] = elem.text
-            
-            # Hvis vi fortsatt ikke har tid, prøv votering_tid direkte
-            if 'votering_tid' not in vote_data:
-                tid_elem = votering.find('ns:votering_tid', ns)
-                if tid_elem is not None:
-                    vote_data['votering_tid'] = tid_elem.text
-            
-            if vote_data and vote_data.get('votering_id'):
-                votes.append(vote_data)
+            fornavn = fornavn_elem.text if fornavn_elem is not None else ""
+            etternavn = etternavn_elem.text if etternavn_elem is not None else ""
+            parti_id_elem = parti_elem.find(TAG_ID) if parti_elem is not None else None
+            parti_id = parti_id_elem.text if parti_id_elem is not None else ""
         
-        return votes
+        stemme_elem = stemme.find(TAG_VOTERING_RESULTAT)
+        if stemme_elem is not None:
+            resultat_elem = stemme_elem.find(TAG_ID)
+            stemme_resultat = resultat_elem.text if resultat_elem is not None else ""
+        else:
+            stemme_resultat = ""
         
-    except Exception as e:
-        return []
+        stemmer.append({
+            "navn": f"{fornavn} {etternavn}".strip(),
+            "parti": parti_id,
+            "stemme": stemme_resultat
+        })
+        
+        # Frigjør ferdigbehandlede stemmer så treet ikke vokser
+        stemme.clear()
+        while stemme.getprevious() is not None:
+            del stemme.getparent()[0]
+    
+    # Rotelementet er først kjent når hele dokumentet er lest
+    check_root(context.root)
+    return {"stemmer": stemmer, "dato_tid": dato_tid}
 
-def fetch_vote_details(votering_id):
+@memoize_async
+async def fetch_vote_details(client, sem, votering_id, cacheable=False):
     """
     Hent individuelle stemmer OG riktig dato for en votering.
     """
     url = f"https://data.stortinget.no/eksport/votering?voteringid={votering_id}"
     
     try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
-        
-        root = ET.fromstring(resp.content)
-        ns = {'ns': 'http://data.stortinget.no'}
-        
-        # Hent riktig dato
-        dato_tid = None
-        dato_elem = root.find('.//ns:votering_dato_tid', ns)
-        if dato_elem is not None:
-            dato_tid = dato_elem.text
-        
-        # Hent stemmer
-        stemmer = []
-        for stemme in root.findall('.//ns:representant_votering', ns):
-            representant_elem = stemme.find('ns:representant', ns)
-            if representant_elem is not None:
-                fornavn_elem = representant_elem.find('ns:fornavn', ns)
-                etternavn_elem = representant_elem.find('ns:etternavn', ns)
-                parti_elem = representant_elem.find('ns:parti', ns)
-                
-                fornavn = fornavn_elem.text if fornavn_elem is not None else ""
-                etternavn = etternavn_elem.text if etternavn_elem is not None else ""
-                parti_id = parti_elem.find('ns:id', ns).text if parti_elem is not None and parti_elem.find('ns:id', ns) is not None else ""
-            
-            stemme_elem = stemme.find('ns:votering_resultat', ns)
-            if stemme_elem is not None:
-                resultat_elem = stemme_elem.find('ns:id', ns)
-                stemme_resultat = resultat_elem.text if resultat_elem is not None else ""
-            else:
-                stemme_resultat = ""
-            
-            stemmer.append({
-                "navn": f"{fornavn} {etternavn}".strip(),
-                "parti": parti_id,
-                "stemme": stemme_resultat
-            })
+        return await fetch_xml(client, sem, url, 20, parse_vote_details, cacheable)
         
-        return {"stemmer": stemmer, "dato_tid": dato_tid}
-        
-    except Exception as e:
-        logging.debug(f"Kunne ikke hente detaljer for votering {votering_id}: {e}")
+    except FETCH_ERRORS as e:
+        logging.warning(f"Kunne ikke hente detaljer fra {url}: {e}")
         return {"stemmer": [], "dato_tid": None}
 
-def fetch_sak_details(sak_id):
+def parse_sak_details(content):
+    """
+    Hent sakstittelen fra en sak.
+    """
+    root = check_root(ET.fromstring(content))
+    korttittel = tittel = None
+    for elem in XP_SAKSTITLER(root):
+        if elem.tag == TAG_KORTTITTEL:
+            korttittel = elem.text
+        else:
+            tittel = elem.text
+    
+    # Foretrekk korttittel, fall tilbake til tittel
+    return korttittel or tittel
+
+@memoize_async
+async def fetch_sak_details(client, sem, sak_id, cacheable=False):
     """
     Hent detaljer om en sak.
     """
     url = f"https://data.stortinget.no/eksport/sak?sakid={sak_id}"
     
     try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
-        
-        root = ET.fromstring(resp.content)
-        ns = {'ns': 'http://data.stortinget.no'}
-        
-        tittel_elem = root.find('.//ns:tittel', ns)
-        korttittel_elem = root.find('.//ns:korttittel', ns)
-        
-        tittel = korttittel_elem.text if korttittel_elem is not None and korttittel_elem.text else None
-        if not tittel:
-            tittel = tittel_elem.text if tittel_elem is not None else None
-        
-        return tittel
+        return await fetch_xml(client, sem, url, 20, parse_sak_details, cacheable)
         
-    except Exception as e:
+    except FETCH_ERRORS as e:
+        logging.warning(f"Kunne ikke hente sak fra {url}: {e}")
         return None
 
-def fetch_all_votes():
+def build_vote(vote, titler, detaljer_per_votering):
     """
-    Hent alle voteringer fra 2022 til nå.
+    Sett sammen en votering fra aggregatet, sakstittelen og detaljene.
+    """
+    votering_id = vote.get('votering_id', '')
+    sak_id = vote.get('sak_id', '')
+    antall_for = vote.get('antall_for')
+    antall_mot = vote.get('antall_mot')
+    
+    detaljer = detaljer_per_votering.get(votering_id)
+    if detaljer:
+        stemmer = detaljer["stemmer"]
+        riktig_dato = detaljer["dato_tid"]
+    else:
+        stemmer = []
+        riktig_dato = None
+    
+    # Bruk riktig dato hvis vi fant den
+    votering_tid = riktig_dato if riktig_dato else vote.get('votering_tid', '')
+    if not votering_tid:
+        logging.warning(f"Mangler tid for votering {votering_id}")
+    
+    return {
+        "id": votering_id,
+        "tema": vote.get('votering_tema', 'Ukjent'),
+        "sakstittel": titler[sak_id],
+        "for": int(antall_for) if antall_for not in (None, '-1') else 0,
+        "mot": int(antall_mot) if antall_mot not in (None, '-1') else 0,
+        "vedtatt": vote.get('vedtatt', '').lower() == 'true',
+        "sak_id": sak_id,
+        "tid": votering_tid if votering_tid else datetime.now().isoformat(),
+        "stemmer": stemmer
+    }
+
+async def gather_with_progress(aws, label, every):
+    """
+    Som asyncio.gather, men logger fremdriften for hver every fullførte kall.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    total = len(tasks)
+    done = 0
+    
+    def log_progress(_):
+        nonlocal done
+        done += 1
+        if done % every == 0 or done == total:
+            logging.info(f"  Behandlet {done}/{total} {label}")
+    
+    for task in tasks:
+        task.add_done_callback(log_progress)
+    
+    return await asyncio.gather(*tasks)
+
+async def fetch_all_votes(include_stemmer=True):
+    """
+    Hent alle voteringer fra 2022 til nå. Uten include_stemmer hentes
+    voteringsdetaljer bare for voteringer som mangler tid.
     """
     sessions = fetch_all_sessions_since_2022()
-    all_votes = []
     
-    for sesjon in sessions:
-        sak_ids = fetch_saker_from_session(sesjon)
+    # HTTP/2 multiplekser mange kall over samme forbindelse, og
+    # keep-alive-forbindelser gjenbrukes på tvers av alle kall
+    limits = httpx.Limits(
+        max_connections=POOL_SIZE,
+        max_keepalive_connections=POOL_SIZE,
+        keepalive_expiry=30
+    )
+    
+    # Semaforen lages her så den hører til event loopen som kjører nå
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    
+    # httpx ber om gzip/deflate og pakker ut svarene selv. Følg omdirigeringer
+    # slik requests og aiohttp gjorde; httpx gjør det ikke som standard
+    async with httpx.AsyncClient(http2=True, limits=limits, follow_redirects=True) as client:
+        # Steg 1: hent saker fra alle sesjoner. Svar fra avsluttede sesjoner
+        # endres ikke og kan hentes fra cache
+        saker_per_sesjon = await asyncio.gather(
+            *[fetch_saker_from_session(client, sem, sesjon) for sesjon in sessions]
+        )
+        # Én oppføring per (sesjon, sak): en sak som står i flere sesjoner gir
+        # voteringene sine én gang per sesjon
+        saker = [
+            (sesjon, sak_id)
+            for sesjon, sak_ids in zip(sessions, saker_per_sesjon)
+            for sak_id in sak_ids
+        ]
         
-        # Hent voteringer fra alle saker i denne sesjonen
-        for i, sak_id in enumerate(sak_ids):
-            if i % 50 == 0:
-                logging.info(f"  Behandler sak {i+1}/{len(sak_ids)} i {sesjon}")
-            
-            votes = fetch_voteringer_for_sak(sak_id)
-            
-            for vote in votes:
-                # Hent sakstittel
-                sakstittel = fetch_sak_details(vote.get('sak_id', ''))
-                
-                # Hent individuelle stemmer OG riktig dato
-                votering_id = vote.get('votering_id', '')
-                detaljer = fetch_vote_details(votering_id)
-                stemmer = detaljer["stemmer"]
-                riktig_dato = detaljer["dato_tid"]
-                
-                # Bruk riktig dato hvis vi fant den
-                votering_tid = riktig_dato if riktig_dato else vote.get('votering_tid', '')
-                
-                vote_obj = {
-                    "id": votering_id,
-                    "tema": vote.get('votering_tema', 'Ukjent'),
-                    "sakstittel": sakstittel,
-                    "for": int(vote.get('antall_for', 0)) if vote.get('antall_for') not in [None, '-1'] else 0,
-                    "mot": int(vote.get('antall_mot', 0)) if vote.get('antall_mot') not in [None, '-1'] else 0,
-                    "vedtatt": vote.get('vedtatt', '').lower() == 'true',
-                    "sak_id": vote.get('sak_id', ''),
-                    "tid": votering_tid if votering_tid else datetime.now().isoformat(),
-                    "stemmer": stemmer
-                }
-                
-                if not votering_tid:
-                    logging.warning(f"Mangler tid for votering {votering_id}")
-                
-                all_votes.append(vote_obj)
+        # Hver sak hentes likevel bare én gang, og caches bare hvis alle
+        # sesjonene den står i er avsluttet
+        sak_cacheable = {}
+        for sesjon, sak_id in saker:
+            sak_cacheable[sak_id] = sak_cacheable.get(sak_id, True) and session_is_closed(sesjon)
+        
+        # Steg 2: hent voteringer for alle saker
+        logging.info(f"Henter voteringer for {len(sak_cacheable)} saker")
+        voteringer_per_sak = dict(zip(sak_cacheable, await gather_with_progress(
+            [fetch_voteringer_for_sak(client, sem, sak_id, cacheable) for sak_id, cacheable in sak_cacheable.items()],
+            "saker", 50
+        )))
+        voteringer = [
+            (vote, sak_cacheable[sak_id])
+            for _, sak_id in saker
+            for vote in voteringer_per_sak[sak_id]
+        ]
+        
+        # Steg 3: hent hver sakstittel og hver votering én gang
+        unike_saker = {}
+        for vote, cacheable in voteringer:
+            unike_saker.setdefault(vote.get('sak_id', ''), cacheable)
+        unike_voteringer = {
+            vote.get('votering_id', ''): cacheable
+            for vote, cacheable in voteringer
+            if include_stemmer or not vote.get('votering_tid')
+        }
+        
+        logging.info(f"Henter {len(unike_saker)} sakstitler og {len(unike_voteringer)} voteringer")
+        sakstitler, alle_detaljer = await asyncio.gather(
+            gather_with_progress(
+                [fetch_sak_details(client, sem, sak_id, cacheable) for sak_id, cacheable in unike_saker.items()],
+                "sakstitler", 50
+            ),
+            gather_with_progress(
+                [fetch_vote_details(client, sem, votering_id, cacheable) for votering_id, cacheable in unike_voteringer.items()],
+                "voteringer", 500
+            )
+        )
+        titler = dict(zip(unike_saker, sakstitler))
+        detaljer_per_votering = dict(zip(unike_voteringer, alle_detaljer))
+    
+    # Steg 4: sett sammen voteringene
+    all_votes = [build_vote(vote, titler, detaljer_per_votering) for vote, _ in voteringer]
     
     # Sorter etter tid (nyeste først)
-    all_votes.sort(key=lambda x: x['tid'], reverse=True)
+    all_votes.sort(key=itemgetter('tid'), reverse=True)
     
     logging.info(f"Totalt {len(all_votes)} voteringer funnet")
     return all_votes
@@ -234,20 +510,33 @@ def save_to_json(votes):
     
     output_file = os.path.join(output_dir, "votes.json")
     
-    data = {
+    # Kompakt utskrift: mindre fil og raskere skriving enn indent=2
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    header = encoder.encode({
         "siste_oppdatering": datetime.now().isoformat(),
-        "antall_voteringer": len(votes),
-        "voteringer": votes
-    }
+        "antall_voteringer": len(votes)
+    })
     
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        # Kod én votering om gangen: encode() bruker C-koderen, mens json.dump
+        # går gjennom den langsommere Python-versjonen av iterencode
+        f.write(header[:-1] + ',"voteringer":[')
+        for i, vote in enumerate(votes):
+            if i:
+                f.write(',')
+            f.write(encoder.encode(vote))
+        f.write(']}')
     
     logging.info(f"Data lagret til {output_file}")
 
-def main():
+async def main():
+    parser = argparse.ArgumentParser(description="Hent alle voteringer fra Stortinget.")
+    parser.add_argument("--uten-stemmer", action="store_true",
+                        help="ikke hent individuelle stemmer for voteringer som allerede har tid")
+    args = parser.parse_args()
+    
     logging.info("Starter henting av alle voteringer...")
-    votes = fetch_all_votes()
+    votes = await fetch_all_votes(include_stemmer=not args.uten_stemmer)
     
     if votes:
         save_to_json(votes)
@@ -256,4 +545,4 @@ def main():
         logging.warning("Ingen voteringer funnet")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file